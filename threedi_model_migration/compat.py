@@ -0,0 +1,11 @@
+import sys
+
+
+# Use __slots__ on the many small dataclasses where supported (Python 3.10+)
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# The compression level of a ZipInfo is public from Python 3.13 on; earlier
+# (frozen) releases only have the attribute that ZipFile.writestr sets
+ZIPINFO_COMPRESS_LEVEL = (
+    "compress_level" if sys.version_info >= (3, 13) else "_compresslevel"
+)
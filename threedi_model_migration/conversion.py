@@ -1,14 +1,16 @@
 from .file import Raster
 from .metadata import InpyMeta
 from .metadata import SchemaMeta
+from .repository import FileIndex
 from .repository import Repository
 from .schematisation import SchemaRevision
 from .schematisation import Schematisation
 from .text_utils import slugify
 from collections import defaultdict
+from operator import attrgetter
 from pathlib import Path
+from typing import Any
 from typing import Dict
-from typing import List
 from typing import Optional
 
 import logging
@@ -18,14 +20,18 @@ logger = logging.getLogger(__name__)
 
 
 def raster_lookup(
-    repository: Repository, revision_nr: int, sqlite_path: Path, raster: Raster
+    repository: Repository,
+    file_index: FileIndex,
+    revision_nr: int,
+    sqlite_path: Path,
+    raster: Raster,
 ):
-    revision, file = repository.get_file(revision_nr, raster.path)
+    revision, file = file_index.get_file(revision_nr, raster.path)
     if file is None:
         # it could be that the raster path was not relative to the sqlite, but
         # relative to the repo.
         other_path = raster.path.relative_to(sqlite_path.parent)
-        revision, file = repository.get_file(revision_nr, other_path)
+        revision, file = file_index.get_file(revision_nr, other_path)
         if file is None:
             logger.warning(f"{raster} not present in {repository} #0-{revision_nr}.")
             return
@@ -39,10 +45,13 @@ def repository_to_schematisations(
     metadata: Optional[Dict[str, SchemaMeta]] = None,
     inpy_data: Optional[Dict[str, InpyMeta]] = None,
     org_lut: Optional[Dict[str, str]] = None,
-) -> List[Schematisation]:
+) -> Dict[str, Any]:
     """Apply logic to convert a repository to several schematisations
 
     Supplied RepoSettings should belong to only 1 repository.
+
+    Returns a plan: a dict with the list of schematisations ("schematisations")
+    and statistics about the repository.
     """
     if metadata:
         _metadata = metadata.get(repository.slug)
@@ -52,12 +61,19 @@ def repository_to_schematisations(
     # schemas is a list of schematisations
     combinations = defaultdict(list)
 
+    # sqlite paths mostly repeat over revisions, slugify each path once
+    path_slugs = {}
+
     # partition into unique (sqlite_path, settings_id) combinations
-    for revision in sorted(repository.revisions, key=lambda x: -x.revision_nr):
+    for revision in sorted(
+        repository.revisions, key=attrgetter("revision_nr"), reverse=True
+    ):
         seen = set()
         for sqlite in revision.sqlites or []:
             # slugify sqlite paths in the unique key, warn if this yields duplicates
-            path_slug = slugify(sqlite.sqlite_path)
+            path_slug = path_slugs.get(sqlite.sqlite_path)
+            if path_slug is None:
+                path_slug = path_slugs[sqlite.sqlite_path] = slugify(sqlite.sqlite_path)
             if path_slug in seen:
                 logger.warning(
                     f"Revision #{revision.revision_nr}' in {repository} contains "
@@ -70,6 +86,7 @@ def repository_to_schematisations(
                 key = (path_slug, settings.settings_id)
                 combinations[key].append((revision, sqlite, settings))
 
+    file_index = FileIndex(repository.revisions)
     schemas = []
     for _combinations in combinations.values():
         _, last_sqlite, last_settings = _combinations[0]
@@ -78,44 +95,51 @@ def repository_to_schematisations(
             sqlite_path=last_sqlite.sqlite_path,
             settings_id=last_settings.settings_id,
             settings_name=last_settings.settings_name,
-            revisions=[],
             metadata=_metadata,
         )
 
-        # append the revision for each
+        # collect the revision for each
+        revisions = []
         for (revision, sqlite, settings) in _combinations:
-            sqlite_revision_nr, sqlite_file = repository.get_file(
-                revision.revision_nr, sqlite.sqlite_path
+            revision_nr = revision.revision_nr
+            sqlite_path = sqlite.sqlite_path
+            sqlite_revision_nr, sqlite_file = file_index.get_file(
+                revision_nr, sqlite_path
             )
             if sqlite_file is None:
-                raise FileNotFoundError(f"Sqlite {sqlite.sqlite_path} does not exist")
-            rasters = [
-                raster_lookup(repository, revision.revision_nr, sqlite.sqlite_path, x)
-                for x in settings.rasters
-            ]
-            rasters = [x for x in rasters if x is not None]
-            if sqlite_revision_nr != revision.revision_nr and not any(
-                x[0] == revision.revision_nr for x in rasters
-            ):
-                logger.debug(
-                    f"Skipped rev #{revision.revision_nr} in '{schematisation}'."
+                raise FileNotFoundError(f"Sqlite {sqlite_path} does not exist")
+            # look up the rasters and check if any of them changed in this revision
+            rasters = []
+            rasters_changed = False
+            for x in settings.rasters:
+                lookup = raster_lookup(
+                    repository, file_index, revision_nr, sqlite_path, x
                 )
+                if lookup is None:
+                    continue
+                raster_revision_nr, raster = lookup
+                rasters.append(raster)
+                if raster_revision_nr == revision_nr:
+                    rasters_changed = True
+            if sqlite_revision_nr != revision_nr and not rasters_changed:
+                logger.debug(f"Skipped rev #{revision_nr} in '{schematisation}'.")
                 continue
 
-            schematisation.revisions.append(
+            revisions.append(
                 SchemaRevision(
-                    sqlite_path=sqlite.sqlite_path,
+                    sqlite_path=sqlite_path,
                     settings_name=settings.settings_name,
-                    revision_nr=revision.revision_nr,
+                    revision_nr=revision_nr,
                     revision_hash=revision.revision_hash,
                     last_update=revision.last_update,
                     commit_msg=revision.commit_msg,
                     commit_user=revision.commit_user,
                     sqlite=sqlite_file,
-                    rasters=[x[1] for x in rasters if x is not None],
+                    rasters=rasters,
                     version=sqlite.version,
                 )
             )
+        schematisation.revisions = tuple(revisions)
 
         if len(schematisation.revisions) == 0:
             raise RuntimeError(f"Schematisation {schematisation.name} has 0 revisions!")
@@ -128,30 +152,36 @@ def repository_to_schematisations(
         schemas.append(schematisation)
 
     # check schematisation slug uniqueness (logic is mostly for nice error feedback)
-    slugs = [s.slug for s in schemas]
-    seen = set()
-    duplicates = [x for x in slugs if x in seen or seen.add(x)]
-    if len(duplicates) > 0:
-        groups = {}
-        for duplicate in duplicates:
-            groups[duplicate] = [
-                (s.repo_slug, s.sqlite_path, s.settings_name, s.settings_id)
-                for s in schemas
-                if s.slug == duplicate
-            ]
+    schemas_by_slug = defaultdict(list)
+    for schematisation in schemas:
+        schemas_by_slug[schematisation.slug].append(schematisation)
+    groups = {
+        slug: [
+            (s.repo_slug, s.sqlite_path, s.settings_name, s.settings_id)
+            for s in _schemas
+        ]
+        for (slug, _schemas) in schemas_by_slug.items()
+        if len(_schemas) > 1
+    }
+    if len(groups) > 0:
         raise RuntimeError(f"Non-unique schematisation slugs: {groups}")
 
-    # extract unique files
-    files_in_schema = set()
+    # extract unique files (by md5) and sum their sizes in one pass
+    md5s_in_schema = set()
+    file_size = 0
     for schematisation in schemas:
-        files_in_schema |= schematisation.get_files()
+        for file in schematisation.iter_files():
+            if file.md5 in md5s_in_schema:
+                continue
+            md5s_in_schema.add(file.md5)
+            file_size += file.size
 
     # list files omitted from schematisations
     files_omitted = {}
     for revision in repository.revisions:
-        omitted = set(revision.changes) - files_in_schema
+        omitted = {x.md5: x for x in revision.changes if x.md5 not in md5s_in_schema}
         if len(omitted) > 0:
-            files_omitted[str(revision.revision_nr)] = list(omitted)
+            files_omitted[str(revision.revision_nr)] = list(omitted.values())
 
     # insert data from inpy
     if inpy_data is not None and repository.slug in inpy_data:
@@ -170,8 +200,8 @@ def repository_to_schematisations(
 
     return {
         "count": len(schemas),
-        "file_count": len(files_in_schema),
-        "file_size_mb": int(sum(x.size for x in files_in_schema) / (1024 ** 2)),
+        "file_count": len(md5s_in_schema),
+        "file_size_mb": int(file_size / (1024 ** 2)),
         "files_omitted": files_omitted,
         "repository_slug": repository.slug,
         "repository_meta": _metadata,
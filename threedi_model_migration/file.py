@@ -1,7 +1,10 @@
+from .compat import DATACLASS_SLOTS
 from enum import Enum
 from pathlib import Path
 from typing import BinaryIO
 from typing import Optional
+from typing import Tuple
+from typing import Union
 
 import dataclasses
 import hashlib
@@ -55,24 +58,25 @@ def compute_md5(path: Path, chunk_size: int = 16777216):
     return md5, file_size
 
 
-def compare_paths(actual: Path, user_supplied: Path):
+def path_key(actual: Path) -> Union[Path, str]:
+    """Hashable key of a path: sqlite paths match exactly, others case-insensitive"""
     if actual.suffix == ".sqlite":
-        return actual == user_supplied
+        return actual
+    return actual.as_posix().lower()
 
-    # convert to lowercase string
-    actual = actual.as_posix().lower()
-    user_supplied = user_supplied.as_posix().lower()
 
-    # replace backslash with slash
-    user_supplied.replace("\\", "/")
-    # strip whitespace and quotes
-    user_supplied.strip().strip("'\"")
+def path_lookup_keys(user_supplied: Path) -> Tuple[Path, str]:
+    """The keys (see path_key) that match a user supplied path"""
+    return user_supplied, user_supplied.as_posix().lower()
 
-    return actual == user_supplied
 
-
-@dataclasses.dataclass
+@dataclasses.dataclass(eq=False, **DATACLASS_SLOTS)
 class File:
+    """A file in a repository revision, identified by its contents (md5)
+
+    Files without md5 are identified by their path.
+    """
+
     path: Path
     size: Optional[int] = None  # in bytes
     md5: Optional[str] = None
@@ -84,11 +88,19 @@ class File:
     def __repr__(self):
         return f"{self.__class__.__name__}({str(self.path)})"
 
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        if self.md5 is None or other.md5 is None:
+            # not hashed (yet): fall back to the path
+            return self.path == other.path and self.md5 == other.md5
+        return self.md5 == other.md5
+
     def __hash__(self):
-        return int(self.md5, 16)
+        return hash(self.path if self.md5 is None else self.md5)
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(eq=False, **DATACLASS_SLOTS)
 class Raster(File):
     raster_type: RasterOptions = None
 
@@ -97,6 +109,3 @@ class Raster(File):
 
     def __repr__(self):
         return f"{self.__class__.__name__}({str(self.path)})"
-
-    def as_file(self) -> File:
-        return File(path=self.path, size=self.size, md5=self.md5)
@@ -1,14 +1,19 @@
 from . import hg
-from .file import compare_paths
+from .compat import DATACLASS_SLOTS
 from .file import File
+from .file import path_key
+from .file import path_lookup_keys
 from .file import Raster
 from .file import RasterOptions
-from .sql import RASTER_SQL_MAP
+from .sql import connect
 from .sql import select
+from .sql import select_rasters
 from .sql import SETTINGS_SQL
 from .sql import VERSION_SQL
+from collections import defaultdict
 from copy import copy
 from datetime import datetime
+from operator import attrgetter
 from pathlib import Path
 from typing import Iterator
 from typing import List
@@ -17,23 +22,61 @@ from typing import Tuple
 
 import dataclasses
 import logging
+import os
 import shutil
 import sqlite3
+import sys
 
 
-__all__ = ["Repository", "RepoSettings", "RepoRevision", "RepoSqlite"]
+__all__ = ["Repository", "RepoSettings", "RepoRevision", "RepoSqlite", "FileIndex"]
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_REMOTE = "https://hg.lizard.net"
 
 
-@dataclasses.dataclass
+# resolved repository path -> ((mtime_ns, size) of the changelog, hg log records)
+_LOG_CACHE = {}
+
+
+def _log(repo_path: Path):
+    """Return the parsed hg log records, reusing them if the changelog is unchanged"""
+    try:
+        stat = os.stat(repo_path / ".hg" / "store" / "00changelog.i")
+    except FileNotFoundError:
+        return hg.log(repo_path)
+    key = str(repo_path.resolve())
+    state = (stat.st_mtime_ns, stat.st_size)
+    cached = _LOG_CACHE.get(key)
+    if cached is None or cached[0] != state:
+        cached = _LOG_CACHE[key] = (state, tuple(hg.log(repo_path)))
+    return cached[1]
+
+
+def _iter_sqlite_paths(base: Path) -> Iterator[Path]:
+    """Yield the *.sqlite files in a working directory, relative to it
+
+    The Mercurial metadata directories (.hg, .hglf) are not traversed.
+    """
+    for dirpath, dirnames, filenames in os.walk(base):
+        if dirpath == str(base):
+            dirnames[:] = [x for x in dirnames if x not in (".hg", ".hglf")]
+        for filename in filenames:
+            if filename.endswith(".sqlite"):
+                yield Path(dirpath, filename).relative_to(base)
+
+
+@dataclasses.dataclass(**DATACLASS_SLOTS)
 class RepoSettings:
     settings_id: int
     settings_name: str
     rasters: List[Raster] = ()
 
+    def __post_init__(self):
+        # settings names repeat across revisions, share a single string
+        if self.settings_name is not None:
+            self.settings_name = sys.intern(self.settings_name)
+
     @classmethod
     def from_record(cls, record):
         rasters = []
@@ -47,7 +90,7 @@ class RepoSettings:
         return f"RepoSettings(id={self.settings_id}, name={self.settings_name})"
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(**DATACLASS_SLOTS)
 class RepoSqlite:
     sqlite_path: Path  # relative path within repository
     settings: Optional[List[RepoSettings]] = None
@@ -75,39 +118,34 @@ class RepoSqlite:
             full_path = repository.path / self.sqlite_path
 
             try:
-                records = select(full_path, SETTINGS_SQL)
+                with connect(full_path) as con:
+                    self.settings = self._select_settings(con)
             except (sqlite3.OperationalError, sqlite3.DatabaseError) as e:
                 logger.warning(f"{self} error {e}")
-                records = []
-
-            if len(records) == 0:
                 self.settings = []
-                return self.settings
 
-            # Pragmatic fix: in earlier sqlite schemas, some tables / columns
-            # may not exist. Do each query separately and wrap in try..except.
-            records = [list(record) for record in records]
-            for option in RasterOptions:
-                try:
-                    paths = select(full_path, RASTER_SQL_MAP[option])
-                except sqlite3.OperationalError:
-                    paths = [(None,)] * len(records)
+        return self.settings
 
-                for record, path in zip(records, paths):
-                    raster_path = path[0]
-                    if raster_path:
-                        raster_path = self.sqlite_path.parent / Path(raster_path)
-                    record.append(raster_path)
+    def _select_settings(self, con: sqlite3.Connection) -> List[RepoSettings]:
+        records = con.execute(SETTINGS_SQL).fetchall()
+        if len(records) == 0:
+            return []
 
-            self.settings = [RepoSettings.from_record(record) for record in records]
+        records = [list(record) for record in records]
+        paths = select_rasters(con, len(records))
+        for option in RasterOptions:
+            for record, raster_path in zip(records, paths[option]):
+                if raster_path:
+                    raster_path = self.sqlite_path.parent / Path(raster_path)
+                record.append(raster_path)
 
-        return self.settings
+        return [RepoSettings.from_record(record) for record in records]
 
     def __repr__(self):
         return f"RepoSqlite({self.sqlite_path})"
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(**DATACLASS_SLOTS)
 class RepoRevision:
     revision_nr: int
     revision_hash: str
@@ -117,6 +155,11 @@ class RepoRevision:
     changes: List[File] = ()
     sqlites: Optional[List[RepoSqlite]] = None
 
+    def __post_init__(self):
+        # commit users repeat across revisions, share a single string
+        if self.commit_user is not None:
+            self.commit_user = sys.intern(self.commit_user)
+
     def get_sqlites(
         self, do_checkout=True, repository: Optional["Repository"] = None
     ) -> List[RepoSqlite]:
@@ -127,11 +170,9 @@ class RepoRevision:
             if do_checkout:
                 repository.checkout(self.revision_hash)
             base = repository.path.resolve()
-            glob = [path.relative_to(base) for path in base.glob("**/*.sqlite")]
             self.sqlites = [
                 RepoSqlite(sqlite_path=path)
-                for path in sorted(glob)
-                if path.parts[0] != ".hglf"
+                for path in sorted(_iter_sqlite_paths(base))
             ]
             for sqlite in self.sqlites:
                 sqlite.set_version(repository=repository)
@@ -150,6 +191,35 @@ class RepoRevision:
         return f"RepoRevision({self.revision_nr})"
 
 
+class FileIndex:
+    """Changed files of a list of revisions, indexed by path
+
+    Paths are matched by file.path_key, so only the files that have a
+    matching path are visited.
+    """
+
+    def __init__(self, revisions: List[RepoRevision]):
+        self._files = defaultdict(list)
+        for i, revision in enumerate(revisions):
+            for j, file in enumerate(revision.changes):
+                entry = ((i, j), revision.revision_nr, file)
+                self._files[path_key(file.path)].append(entry)
+
+    def get_file(self, revision_nr: int, path: Path) -> Tuple[int, File]:
+        """Inspect revisions <revision_nr> and earlier to get a File"""
+        found = None
+        for key in path_lookup_keys(path):
+            for entry in self._files.get(key, ()):
+                if entry[1] <= revision_nr:
+                    if found is None or entry[0] < found[0]:
+                        found = entry
+                    break
+
+        if found is None:
+            return None, None
+        return found[1], found[2]
+
+
 @dataclasses.dataclass
 class Repository:
     base_path: Path
@@ -204,6 +274,7 @@ class Repository:
         return hg.identify_tip(remote)
 
     def delete(self):
+        _LOG_CACHE.pop(str(self.path.resolve()), None)
         if self.path.exists():
             shutil.rmtree(self.path)
 
@@ -215,14 +286,16 @@ class Repository:
         Optionally filter by last_update. If supplied, only revisions newer than that
         date are considered.
         """
-        new_revs = [RepoRevision.from_log(**x) for x in hg.log(self.path)]
+        new_revs = [RepoRevision.from_log(**x) for x in _log(self.path)]
         existing_hashes = set(r.revision_hash for r in (self.revisions or []))
         if existing_hashes:
             # Merge with what is already present
             for new_rev in new_revs:
                 if new_rev.revision_hash not in existing_hashes:
                     self.revisions.append(new_rev)
-            self.revisions = sorted(self.revisions, key=lambda x: -x.revision_nr)
+            self.revisions = sorted(
+                self.revisions, key=attrgetter("revision_nr"), reverse=True
+            )
             rev_nrs = [rev.revision_nr for rev in self.revisions]
             if len(rev_nrs) != len(set(rev_nrs)):
                 raise RuntimeError(f"{self} has non-unique revisions numbers!")
@@ -281,12 +354,16 @@ class Repository:
         self.checkout("tip")
 
     def get_file(self, revision_nr: int, path: Path) -> Tuple[int, File]:
-        """Inspect revisions <revision_nr> and earlier to get a File"""
+        """Inspect revisions <revision_nr> and earlier to get a File
+
+        To look up many files, build a FileIndex once instead.
+        """
+        keys = path_lookup_keys(path)
         for revision in self.revisions:
             if revision.revision_nr > revision_nr:
                 continue
             for file in revision.changes:
-                if compare_paths(file.path, path):
+                if path_key(file.path) in keys:
                     return revision.revision_nr, file
 
         return None, None
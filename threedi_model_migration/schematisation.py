@@ -1,3 +1,4 @@
+from .compat import DATACLASS_SLOTS
 from .file import File
 from .file import Raster
 from .metadata import SchemaMeta
@@ -5,15 +6,17 @@ from .text_utils import slugify
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Iterator
 from typing import Optional
-from typing import Set
+from typing import Tuple
+
+import sys
 
 
 __all__ = ["Schematisation", "SchemaRevision"]
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class SchemaRevision:
     sqlite_path: Path  # relative to repository dir
     settings_name: str
@@ -27,22 +30,31 @@ class SchemaRevision:
 
     # files
     sqlite: File
-    rasters: List[Raster]
+    rasters: Tuple[Raster, ...]
 
     version: int = None
 
+    def __post_init__(self):
+        if self.settings_name is not None:
+            self.settings_name = sys.intern(self.settings_name)
+        self.rasters = tuple(self.rasters)
+
     def __repr__(self):
         return f"SchemaRevision({self.revision_nr})"
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Schematisation:
     repo_slug: str
     sqlite_path: Path  # the newest of its revisions
     settings_id: int
     settings_name: str  # the newest of its revisions
     metadata: Optional[SchemaMeta] = None
-    revisions: Optional[List[SchemaRevision]] = None
+    revisions: Optional[Tuple[SchemaRevision, ...]] = None
+
+    def __post_init__(self):
+        if self.revisions is not None:
+            self.revisions = tuple(self.revisions)
 
     @property
     def name(self):
@@ -85,15 +97,12 @@ class Schematisation:
         """
         return slugify(self.name)
 
-    def get_files(self) -> Set[File]:
-        result = set()
+    def iter_files(self) -> Iterator[File]:
+        """Iterate over the sqlite and raster files of all revisions"""
         for revision in self.revisions:
             if revision.sqlite is not None:
-                result.add(revision.sqlite)
-            for raster in revision.rasters:
-                result.add(raster.as_file())
-
-        return result
+                yield revision.sqlite
+            yield from revision.rasters
 
     def __repr__(self):
         return f"Schematisation({self.name})"
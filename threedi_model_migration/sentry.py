@@ -1,10 +1,12 @@
-from sentry_sdk.integrations.logging import LoggingIntegration
-
 import logging
-import sentry_sdk
 
 
 def setup_sentry(dsn):
+    # sentry_sdk is only imported when it is actually used
+    from sentry_sdk.integrations.logging import LoggingIntegration
+
+    import sentry_sdk
+
     sentry_logging = LoggingIntegration(
         level=logging.INFO,  # Capture info and above as breadcrumbs
         event_level=logging.ERROR,  # Send errors and warnings as events
@@ -1,4 +1,5 @@
 from .file import RasterOptions
+from contextlib import contextmanager
 
 import logging
 import sqlite3
@@ -12,65 +13,127 @@ INTERFLOW_SQL = "FROM v2_global_settings LEFT JOIN v2_interflow ON v2_interflow.
 SIMPLE_INFILTRATION_SQL = "FROM v2_global_settings LEFT JOIN v2_simple_infiltration ON v2_simple_infiltration.id = v2_global_settings.simple_infiltration_settings_id"
 GROUNDWATER_SQL = "FROM v2_global_settings LEFT JOIN v2_groundwater ON v2_groundwater.id = v2_global_settings.groundwater_settings_id"
 ORDER_BY = "ORDER BY v2_global_settings.id"
-RASTER_SQL_MAP = {}
-for option in (
-    RasterOptions.dem_file,
-    RasterOptions.frict_coef_file,
-    RasterOptions.interception_file,
-    RasterOptions.initial_waterlevel_file,
-    RasterOptions.initial_groundwater_level_file,
-):
-    RASTER_SQL_MAP[option] = " ".join([option.name, GLOBAL_SETTINGS_SQL, ORDER_BY])
-for option in (
-    RasterOptions.porosity_file,
-    RasterOptions.hydraulic_conductivity_file,
-):
-    RASTER_SQL_MAP[option] = " ".join([option.name, INTERFLOW_SQL, ORDER_BY])
-for option in (
-    RasterOptions.infiltration_rate_file,
-    RasterOptions.max_infiltration_capacity_file,
-):
-    RASTER_SQL_MAP[option] = " ".join([option.name, SIMPLE_INFILTRATION_SQL, ORDER_BY])
-for option in (
-    RasterOptions.equilibrium_infiltration_rate_file,
-    RasterOptions.groundwater_hydro_connectivity_file,
-    RasterOptions.groundwater_impervious_layer_level_file,
-    RasterOptions.infiltration_decay_period_file,
-    RasterOptions.initial_infiltration_rate_file,
-    RasterOptions.phreatic_storage_capacity_file,
-    RasterOptions.leakage_file,
-):
-    RASTER_SQL_MAP[option] = " ".join([option.name, GROUNDWATER_SQL, ORDER_BY])
-
-SETTINGS_SQL = " ".join(["id, name", GLOBAL_SETTINGS_SQL, ORDER_BY])
-DELETE_GLOBAL_SETTING = "DELETE FROM v2_global_settings WHERE id <> {settings_id}"
-DELETE_AGG_SETTING = (
-    "DELETE FROM v2_aggregation_settings WHERE global_settings_id <> {settings_id}"
+RASTER_OPTIONS_PER_TABLE = (
+    (
+        GLOBAL_SETTINGS_SQL,
+        (
+            RasterOptions.dem_file,
+            RasterOptions.frict_coef_file,
+            RasterOptions.interception_file,
+            RasterOptions.initial_waterlevel_file,
+            RasterOptions.initial_groundwater_level_file,
+        ),
+    ),
+    (
+        INTERFLOW_SQL,
+        (
+            RasterOptions.porosity_file,
+            RasterOptions.hydraulic_conductivity_file,
+        ),
+    ),
+    (
+        SIMPLE_INFILTRATION_SQL,
+        (
+            RasterOptions.infiltration_rate_file,
+            RasterOptions.max_infiltration_capacity_file,
+        ),
+    ),
+    (
+        GROUNDWATER_SQL,
+        (
+            RasterOptions.equilibrium_infiltration_rate_file,
+            RasterOptions.groundwater_hydro_connectivity_file,
+            RasterOptions.groundwater_impervious_layer_level_file,
+            RasterOptions.infiltration_decay_period_file,
+            RasterOptions.initial_infiltration_rate_file,
+            RasterOptions.phreatic_storage_capacity_file,
+            RasterOptions.leakage_file,
+        ),
+    ),
 )
-VERSION_SQL = "south_migrationhistory.id FROM south_migrationhistory ORDER BY south_migrationhistory.id DESC LIMIT 1"
+RASTER_SQL_MAP = {}  # one query per raster option
+RASTER_TABLE_SQL = []  # one query per table: (options, query)
+for from_sql, options in RASTER_OPTIONS_PER_TABLE:
+    columns = ", ".join(option.name for option in options)
+    RASTER_TABLE_SQL.append((options, f"SELECT {columns} {from_sql} {ORDER_BY}"))
+    for option in options:
+        RASTER_SQL_MAP[option] = f"SELECT {option.name} {from_sql} {ORDER_BY}"
 
+SETTINGS_SQL = " ".join(["SELECT id, name", GLOBAL_SETTINGS_SQL, ORDER_BY])
+DELETE_GLOBAL_SETTING = "DELETE FROM v2_global_settings WHERE id <> ?"
+DELETE_AGG_SETTING = "DELETE FROM v2_aggregation_settings WHERE global_settings_id <> ?"
+SQLITE_HEADER = b"SQLite format 3\x00"
+VERSION_SQL = "SELECT south_migrationhistory.id FROM south_migrationhistory ORDER BY south_migrationhistory.id DESC LIMIT 1"
 
-def select(full_path, query):
+
+def check_header(full_path):
+    """Raise DatabaseError if the file is not an SQLite database
+
+    This catches placeholder files (e.g. largefiles that were not pulled) before
+    connecting to them.
+    """
+    try:
+        with open(full_path, "rb") as f:
+            header = f.read(len(SQLITE_HEADER))
+    except OSError as e:
+        # e.g. a broken symlink: report it like sqlite3 would
+        raise sqlite3.DatabaseError(f"{full_path} could not be read: {e}") from e
+    if header != SQLITE_HEADER:
+        raise sqlite3.DatabaseError(f"{full_path} is not an SQLite database")
+
+
+@contextmanager
+def connect(full_path):
+    """Open a read-only connection to an SQLite database and close it afterwards
+
+    Use this to run several queries on the same database.
+    """
+    check_header(full_path)
     con = sqlite3.connect(full_path)
     try:
-        with con:
-            cursor = con.execute("SELECT " + query)
-        records = cursor.fetchall()
+        con.execute("PRAGMA query_only = 1")
+        yield con
     finally:
         con.close()
 
-    return records
+
+def select(full_path, query):
+    with connect(full_path) as con:
+        return con.execute(query).fetchall()
+
+
+def select_rasters(con, n_records):
+    """Select the raster paths of all global settings rows, per RasterOptions
+
+    The rasters are selected with one query per table. In earlier sqlite schemas,
+    some tables / columns may not exist: then fall back to a query per raster
+    option, yielding None for the options that cannot be selected.
+    """
+    result = {}
+    for options, query in RASTER_TABLE_SQL:
+        try:
+            rows = con.execute(query).fetchall()
+        except sqlite3.OperationalError:
+            for option in options:
+                try:
+                    rows = con.execute(RASTER_SQL_MAP[option]).fetchall()
+                except sqlite3.OperationalError:
+                    rows = [(None,)] * n_records
+                result[option] = [row[0] for row in rows]
+        else:
+            for i, option in enumerate(options):
+                result[option] = [row[i] for row in rows]
+    return result
 
 
 def filter_global_settings(full_path, settings_id):
     """Remove global settings, keeping only `settings_id`"""
-    settings_id = int(settings_id)  # prevents SQL injection
     con = sqlite3.connect(full_path)
     try:
         with con:
-            con.execute(DELETE_GLOBAL_SETTING.format(settings_id=settings_id))
+            con.execute(DELETE_GLOBAL_SETTING, (settings_id,))
             try:
-                con.execute(DELETE_AGG_SETTING.format(settings_id=settings_id))
+                con.execute(DELETE_AGG_SETTING, (settings_id,))
             except sqlite3.OperationalError:
                 pass
     finally:
@@ -3,6 +3,7 @@ from threedi_model_migration import hg
 from threedi_model_migration.repository import Repository
 
 import pytest
+import shutil
 import sqlite3
 
 
@@ -69,12 +70,17 @@ def repository(tmp_path_factory):
     repo_path = tmp_path / "testrepo"
     hg.init(repo_path)
 
+    # create the tables that are common to both sqlites once, in memory
+    template = sqlite3.connect(":memory:")
+    with template:
+        template.execute(f"CREATE TABLE {GLOBAL_SETTINGS_SCHEMA}")
+        template.execute(f"CREATE TABLE {INTERFLOW_SCHEMA}")
+        template.execute(f"CREATE TABLE {SIMPLE_INFILTRATION_SCHEMA}")
+
     # write a sqlite
     con = sqlite3.connect(repo_path / "db1.sqlite")
+    template.backup(con)
     with con:
-        con.execute(f"CREATE TABLE {GLOBAL_SETTINGS_SCHEMA}")
-        con.execute(f"CREATE TABLE {INTERFLOW_SCHEMA}")
-        con.execute(f"CREATE TABLE {SIMPLE_INFILTRATION_SCHEMA}")
         # This asserts that inspect() passes without a groundwater table:
         # con.execute(f"CREATE TABLE {GROUNDWATER_SCHEMA}")
         con.execute(
@@ -86,10 +92,8 @@ def repository(tmp_path_factory):
 
     # add another sqlite
     con = sqlite3.connect(repo_path / "db2.sqlite")
+    template.backup(con)
     with con:
-        con.execute(f"CREATE TABLE {GLOBAL_SETTINGS_SCHEMA}")
-        con.execute(f"CREATE TABLE {INTERFLOW_SCHEMA}")
-        con.execute(f"CREATE TABLE {SIMPLE_INFILTRATION_SCHEMA}")
         con.execute(f"CREATE TABLE {GROUNDWATER_SCHEMA}")
         con.execute(
             "INSERT INTO v2_global_settings (id, name, dem_file) VALUES (1, 'default', 'rasters/dem.tif')"
@@ -101,6 +105,7 @@ def repository(tmp_path_factory):
             "INSERT INTO v2_groundwater (id, groundwater_impervious_layer_level_file) VALUES (1, 'rasters/x.tif')"
         )
     con.close()
+    template.close()
     hg.add(repo_path, "db2.sqlite")
     hg.commit(repo_path, "db2.sqlite", "My second commit")
     return Repository(base_path=tmp_path, slug="testrepo")
@@ -111,3 +116,30 @@ def repository_inspected(repository):
     inspected = Repository(base_path=repository.base_path, slug=repository.slug)
     list(inspected.inspect())
     return inspected
+
+
+@pytest.fixture(scope="session")
+def sqlites_original(repository, tmp_path_factory):
+    """Copies of the sqlites in the newest revision (do not modify)"""
+    repository.checkout(1)
+    path = tmp_path_factory.mktemp("sqlites")
+    for name in ("db1.sqlite", "db2.sqlite"):
+        shutil.copyfile(repository.path / name, path / name)
+    return path
+
+
+@pytest.fixture(scope="session")
+def db1_sqlite_original(sqlites_original):
+    return sqlites_original / "db1.sqlite"
+
+
+@pytest.fixture(scope="session")
+def db2_sqlite_original(sqlites_original):
+    return sqlites_original / "db2.sqlite"
+
+
+@pytest.fixture
+def db2_sqlite(db2_sqlite_original, tmp_path):
+    path = tmp_path / "db2.sqlite"
+    shutil.copyfile(db2_sqlite_original, path)
+    return path
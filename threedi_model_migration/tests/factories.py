@@ -1,3 +1,4 @@
+from itertools import count
 from pathlib import Path
 from threedi_model_migration.file import File
 from threedi_model_migration.file import Raster
@@ -7,8 +8,17 @@ from threedi_model_migration.repository import Repository
 import factory
 
 
+# Files are identified by md5: draw them from one counter so that files and
+# rasters never collide by accident
+_md5_counter = count()
+
+
+def _next_md5():
+    return f"{next(_md5_counter):032x}"
+
+
 class FileFactory(factory.Factory):
-    md5 = factory.Faker("md5", raw_output=False)
+    md5 = factory.LazyFunction(_next_md5)
     size = factory.Faker("random_int", min=1)
 
     class Meta:
@@ -16,7 +26,7 @@ class FileFactory(factory.Factory):
 
 
 class RasterFactory(factory.Factory):
-    md5 = factory.Faker("md5", raw_output=False)
+    md5 = factory.LazyFunction(_next_md5)
     size = factory.Faker("random_int", min=1)
 
     class Meta:
@@ -2,6 +2,7 @@ from .factories import FileFactory
 from .factories import RasterFactory
 from .factories import RepoRevisionFactory
 from .factories import RepositoryFactory
+from operator import attrgetter
 from pathlib import Path
 from threedi_model_migration.conversion import repository_to_schematisations
 from threedi_model_migration.repository import RepoSettings as Sett
@@ -10,51 +11,70 @@ from threedi_model_migration.repository import RepoSqlite as Sql
 import pytest
 
 
-def gen_repo(*revision_sqlites, changes=None):
+# Paths are immutable and can be shared between cases; settings and sqlites
+# are mutable dataclasses and are constructed per case.
+DB1 = Path("db1")
+DB2 = Path("db2")
+R_TIFF = Path("r.tiff")
+
+MiB = 1024 ** 2
+
+
+def gen_repo(*revision_sqlites, changes=None, sizes=None):
     if changes is None:
         # Every sqlite is present in its associated changeset
-        changes = [
-            [sqlite.sqlite_path for sqlite in sqlites] for sqlites in revision_sqlites
-        ]
-    n = len(revision_sqlites)
+        get_path = attrgetter("sqlite_path")
+        changes = [list(map(get_path, sqlites)) for sqlites in revision_sqlites]
+    if sizes is None:
+        # Let the factory pick the file sizes
+        sizes = [[{}] * len(_changes) for _changes in changes]
+    else:
+        sizes = [[{"size": size} for size in _sizes] for _sizes in sizes]
+    # The first revision passed in is the newest
+    revision_nrs = range(len(revision_sqlites) - 1, -1, -1)
     revisions = [
-        RepoRevisionFactory(
-            revision_nr=n - i - 1,
+        RepoRevisionFactory.build(
+            revision_nr=revision_nr,
             sqlites=sqlites,
-            changes=[FileFactory(path=path) for path in _changes],
+            changes=[
+                FileFactory.build(path=path, **kwargs)
+                for path, kwargs in zip(_changes, _sizes)
+            ],
+        )
+        for revision_nr, sqlites, _changes, _sizes in zip(
+            revision_nrs, revision_sqlites, changes, sizes
         )
-        for i, (sqlites, _changes) in enumerate(zip(revision_sqlites, changes))
     ]
-    return RepositoryFactory(
+    return RepositoryFactory.build(
         slug="testrepo",
         revisions=revisions,
     )
 
 
 @pytest.mark.parametrize(
-    "repository,expected_names,expected_nrs",
+    "make_repository,expected_names,expected_nrs",
     [
         # One revision, one sqlite, one settings entry
         (
-            gen_repo([Sql(Path("db1"), settings=[Sett(1, "a")])]),
+            lambda: gen_repo([Sql(DB1, settings=[Sett(1, "a")])]),
             ["testrepo - db1_a (1)"],
             [[0]],
         ),
         # Two revisions with the same sqlite and settings
         (
-            gen_repo(
-                [Sql(Path("db1"), settings=[Sett(1, "a")])],
-                [Sql(Path("db1"), settings=[Sett(1, "a")])],
+            lambda: gen_repo(
+                [Sql(DB1, settings=[Sett(1, "a")])],
+                [Sql(DB1, settings=[Sett(1, "a")])],
             ),
             ["testrepo - db1_a (1)"],
             [[1, 0]],
         ),
         # One revision with two sqlites with the same settings
         (
-            gen_repo(
+            lambda: gen_repo(
                 [
-                    Sql(Path("db1"), settings=[Sett(1, "a")]),
-                    Sql(Path("db2"), settings=[Sett(1, "a")]),
+                    Sql(DB1, settings=[Sett(1, "a")]),
+                    Sql(DB2, settings=[Sett(1, "a")]),
                 ]
             ),
             ["testrepo - db1_a (1)", "testrepo - db2_a (1)"],
@@ -62,9 +82,9 @@ def gen_repo(*revision_sqlites, changes=None):
         ),
         # One revision with one sqlite with two settings
         (
-            gen_repo(
+            lambda: gen_repo(
                 [
-                    Sql(Path("db1"), settings=[Sett(1, "a"), Sett(2, "b")]),
+                    Sql(DB1, settings=[Sett(1, "a"), Sett(2, "b")]),
                 ]
             ),
             ["testrepo - db1_a (1)", "testrepo - db1_b (2)"],
@@ -72,46 +92,46 @@ def gen_repo(*revision_sqlites, changes=None):
         ),
         # Two revisions with the same sqlite and settings, one sqlite added
         (
-            gen_repo(
+            lambda: gen_repo(
                 [
-                    Sql(Path("db1"), settings=[Sett(1, "a")]),
-                    Sql(Path("db2"), settings=[Sett(1, "a")]),
+                    Sql(DB1, settings=[Sett(1, "a")]),
+                    Sql(DB2, settings=[Sett(1, "a")]),
                 ],
-                [Sql(Path("db1"), settings=[Sett(1, "a")])],
+                [Sql(DB1, settings=[Sett(1, "a")])],
             ),
             ["testrepo - db1_a (1)", "testrepo - db2_a (1)"],
             [[1, 0], [1]],
         ),
         # Two revisions with the same sqlite and settings, one settings entry added
         (
-            gen_repo(
+            lambda: gen_repo(
                 [
-                    Sql(Path("db1"), settings=[Sett(1, "a"), Sett(2, "b")]),
-                    Sql(Path("db1"), settings=[]),
+                    Sql(DB1, settings=[Sett(1, "a"), Sett(2, "b")]),
+                    Sql(DB1, settings=[]),
                 ],
-                [Sql(Path("db1"), settings=[Sett(1, "a")])],
+                [Sql(DB1, settings=[Sett(1, "a")])],
             ),
             ["testrepo - db1_a (1)", "testrepo - db1_b (2)"],
             [[1, 0], [1]],
         ),
         # Setting is renamed: it is tracked (and the last revision will set the name)
         (
-            gen_repo(
-                [Sql(Path("db1"), settings=[Sett(1, "b")])],
-                [Sql(Path("db1"), settings=[Sett(1, "a")])],
+            lambda: gen_repo(
+                [Sql(DB1, settings=[Sett(1, "b")])],
+                [Sql(DB1, settings=[Sett(1, "a")])],
             ),
             ["testrepo - db1_b (1)"],
             [[1, 0]],
         ),
         # Settings entry skips a revision
         (
-            gen_repo(
+            lambda: gen_repo(
                 [
-                    Sql(Path("db1"), settings=[Sett(1, "a"), Sett(2, "c")]),
+                    Sql(DB1, settings=[Sett(1, "a"), Sett(2, "c")]),
                 ],
-                [Sql(Path("db1"), settings=[Sett(1, "a")])],
+                [Sql(DB1, settings=[Sett(1, "a")])],
                 [
-                    Sql(Path("db1"), settings=[Sett(1, "a"), Sett(2, "b")]),
+                    Sql(DB1, settings=[Sett(1, "a"), Sett(2, "b")]),
                 ],
             ),
             ["testrepo - db1_a (1)", "testrepo - db1_c (2)"],
@@ -119,74 +139,74 @@ def gen_repo(*revision_sqlites, changes=None):
         ),
         # Renaming an sqlite is not allowed
         (
-            gen_repo(
-                [Sql(Path("db2"), settings=[Sett(1, "a")])],
-                [Sql(Path("db1"), settings=[Sett(1, "a")])],
+            lambda: gen_repo(
+                [Sql(DB2, settings=[Sett(1, "a")])],
+                [Sql(DB1, settings=[Sett(1, "a")])],
             ),
             ["testrepo - db1_a (1)", "testrepo - db2_a (1)"],
             [[0], [1]],
         ),
         # File is missing in changet of 2nd revision
         (
-            gen_repo(
-                [Sql(Path("db1"), settings=[Sett(1, "a")])],
-                [Sql(Path("db1"), settings=[Sett(1, "a")])],
-                changes=[[], [Path("db1")]],
+            lambda: gen_repo(
+                [Sql(DB1, settings=[Sett(1, "a")])],
+                [Sql(DB1, settings=[Sett(1, "a")])],
+                changes=[[], [DB1]],
             ),
             ["testrepo - db1_a (1)"],
             [[0]],
         ),
         # Sqlite is missing in changet of 2nd revision but a raster was changed
         (
-            gen_repo(
+            lambda: gen_repo(
                 [
                     Sql(
-                        Path("db1"),
+                        DB1,
                         settings=[
-                            Sett(1, "a", rasters=[RasterFactory(path=Path("r.tiff"))])
+                            Sett(1, "a", rasters=[RasterFactory.build(path=R_TIFF)])
                         ],
                     )
                 ],
                 [
                     Sql(
-                        Path("db1"),
+                        DB1,
                         settings=[
-                            Sett(1, "a", rasters=[RasterFactory(path=Path("r.tiff"))])
+                            Sett(1, "a", rasters=[RasterFactory.build(path=R_TIFF)])
                         ],
                     )
                 ],
-                changes=[[Path("r.tiff")], [Path("db1"), Path("r.tiff")]],
+                changes=[[R_TIFF], [DB1, R_TIFF]],
             ),
             ["testrepo - db1_a (1)"],
             [[1, 0]],
         ),
         # Sqlite is missing in changet of 2nd revision and no raster was changed
         (
-            gen_repo(
+            lambda: gen_repo(
                 [
                     Sql(
-                        Path("db1"),
+                        DB1,
                         settings=[
-                            Sett(1, "a", rasters=[RasterFactory(path=Path("r.tiff"))])
+                            Sett(1, "a", rasters=[RasterFactory.build(path=R_TIFF)])
                         ],
                     )
                 ],
                 [
                     Sql(
-                        Path("db1"),
+                        DB1,
                         settings=[
-                            Sett(1, "a", rasters=[RasterFactory(path=Path("r.tiff"))])
+                            Sett(1, "a", rasters=[RasterFactory.build(path=R_TIFF)])
                         ],
                     )
                 ],
-                changes=[[], [Path("db1"), Path("r.tiff")]],
+                changes=[[], [DB1, R_TIFF]],
             ),
             ["testrepo - db1_a (1)"],
             [[0]],
         ),
         # The case and interpunction in filenames is ignored
         (
-            gen_repo(
+            lambda: gen_repo(
                 [Sql(Path("db1a"), settings=[Sett(1, "a")])],
                 [Sql(Path("DB1;a"), settings=[Sett(1, "a")])],
             ),
@@ -194,11 +214,55 @@ def gen_repo(*revision_sqlites, changes=None):
             [[1, 0]],
         ),
     ],
+    ids=[
+        "one_revision",
+        "two_revisions",
+        "two_sqlites",
+        "two_settings",
+        "sqlite_added",
+        "settings_added",
+        "settings_renamed",
+        "settings_skip_revision",
+        "sqlite_renamed",
+        "sqlite_unchanged",
+        "sqlite_unchanged_raster_changed",
+        "sqlite_unchanged_raster_unchanged",
+        "path_case_ignored",
+    ],
 )
-def test_repo_to_schema(repository, expected_names, expected_nrs):
+def test_repo_to_schema(make_repository, expected_names, expected_nrs):
+    repository = make_repository()
     actual = repository_to_schematisations(repository)["schematisations"]
 
-    # sort by schematisation name
-    actual = sorted(actual, key=lambda x: x.name)
-    assert [x.name for x in actual] == expected_names
-    assert [[rev.revision_nr for rev in x.revisions] for x in actual] == expected_nrs
+    # compare (name, revision_nrs) pairs, sorted by schematisation name
+    assert sorted(
+        (x.name, [rev.revision_nr for rev in x.revisions]) for x in actual
+    ) == list(zip(expected_names, expected_nrs))
+
+
+def test_repo_to_schema_file_count():
+    repository = gen_repo(
+        [Sql(DB1, settings=[Sett(1, "a"), Sett(2, "b")])],
+        [Sql(DB1, settings=[Sett(1, "a")])],
+        sizes=[[3 * MiB], [5 * MiB]],
+    )
+    actual = repository_to_schematisations(repository)
+
+    # the sqlite of revision 1 is shared by both schematisations: count it once
+    assert actual["file_count"] == 2
+    assert actual["file_size_mb"] == 8
+    assert actual["files_omitted"] == {}
+
+
+def test_repo_to_schema_files_omitted():
+    repository = gen_repo(
+        [Sql(DB1, settings=[Sett(1, "a")])],
+        changes=[[DB1, Path("db1_copy"), Path("unused")]],
+    )
+    db1, db1_copy, unused = repository.revisions[0].changes
+    db1_copy.md5 = db1.md5
+    actual = repository_to_schematisations(repository)
+
+    # a copy of a migrated file is not listed as omitted
+    assert actual["file_count"] == 1
+    assert actual["files_omitted"] == {"0": [unused]}
@@ -0,0 +1,22 @@
+from pathlib import Path
+from threedi_model_migration.file import File
+from threedi_model_migration.file import Raster
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "a,b,expected",
+    [
+        (File(Path("a"), md5="x"), File(Path("b"), md5="x"), True),
+        (File(Path("a"), md5="x"), File(Path("a"), md5="y"), False),
+        (File(Path("a")), File(Path("a")), True),
+        (File(Path("a")), File(Path("b")), False),
+        (File(Path("a")), File(Path("a"), md5="x"), False),
+        (File(Path("a"), md5="x"), Raster(Path("a"), md5="x"), False),
+    ],
+)
+def test_file_eq(a, b, expected):
+    assert (a == b) is expected
+    assert (b == a) is expected
+    assert (len({a, b}) == 1) is expected
@@ -1,8 +1,13 @@
-from copy import deepcopy
+from .factories import FileFactory
+from .factories import RepoRevisionFactory
 from pathlib import Path
+from threedi_model_migration import hg
 from threedi_model_migration.file import RasterOptions
+from threedi_model_migration.repository import _iter_sqlite_paths
+from threedi_model_migration.repository import FileIndex
+from threedi_model_migration.repository import Repository
 
-import pytest
+import dataclasses
 
 
 def test_revisions(repository_inspected):
@@ -19,6 +24,31 @@ def test_revisions(repository_inspected):
     assert revisions[1].changes[0].path.name == "db1.sqlite"
 
 
+def test_revision_without_user():
+    revision = RepoRevisionFactory.build(revision_nr=0, commit_user=None)
+    assert revision.commit_user is None
+
+
+def test_revisions_log_cached(repository, monkeypatch):
+    Repository(base_path=repository.base_path, slug=repository.slug).get_revisions()
+    monkeypatch.setattr(hg, "log", None)  # a second hg log would fail
+    revisions = Repository(
+        base_path=repository.base_path, slug=repository.slug
+    ).get_revisions()
+    assert [x.revision_nr for x in revisions] == [1, 0]
+
+
+def test_iter_sqlite_paths(tmp_path):
+    for path in ["x.sqlite", "sub/x.sqlite", ".hglf/x.sqlite", ".hg/x.sqlite", "x.txt"]:
+        (tmp_path / path).parent.mkdir(exist_ok=True)
+        (tmp_path / path).touch()
+
+    assert sorted(_iter_sqlite_paths(tmp_path)) == [
+        Path("sub/x.sqlite"),
+        Path("x.sqlite"),
+    ]
+
+
 def test_checkout_newest(repository):
     repository.checkout(1)
     assert (repository.path / "db1.sqlite").exists()
@@ -61,34 +91,26 @@ def test_settings(repository_inspected):
 
 
 def test_inspect(repository_inspected):
-    result = list(repository_inspected.inspect())
-
-    assert len(result) == 4
+    result = [
+        (revision.revision_nr, sqlite.sqlite_path.name, settings.settings_id)
+        for revision, sqlite, settings in repository_inspected.inspect()
+    ]
 
     # newest to oldest
-    revision, sqlite, settings = result[0]
-    assert revision.revision_nr == 1
-    assert sqlite.sqlite_path.name == "db1.sqlite"
-    assert settings.settings_id == 1
-    revision, sqlite, settings = result[1]
-    assert revision.revision_nr == 1
-    assert sqlite.sqlite_path.name == "db2.sqlite"
-    assert settings.settings_id == 1
-    revision, sqlite, settings = result[2]
-    assert revision.revision_nr == 1
-    assert sqlite.sqlite_path.name == "db2.sqlite"
-    assert settings.settings_id == 2
-    revision, sqlite, settings = result[3]
-    assert revision.revision_nr == 0
-    assert sqlite.sqlite_path.name == "db1.sqlite"
-    assert settings.settings_id == 1
+    assert result == [
+        (1, "db1.sqlite", 1),
+        (1, "db2.sqlite", 1),
+        (1, "db2.sqlite", 2),
+        (0, "db1.sqlite", 1),
+    ]
 
 
 def test_incremental_inspect(repository_inspected):
-    repository = deepcopy(repository_inspected)
-
-    # drop the last revision
-    repository.revisions = repository.revisions[1:]
+    # drop the last revision; inspection only appends to the (copied) list and
+    # leaves the already inspected revisions untouched, so no deepcopy is needed
+    repository = dataclasses.replace(
+        repository_inspected, revisions=repository_inspected.revisions[1:]
+    )
     revision_before = repository.revisions[0]
 
     # redo the inspection
@@ -113,25 +135,42 @@ def test_incremental_inspect(repository_inspected):
     assert revision is revision_before
 
 
-@pytest.mark.parametrize(
-    "revision_nr,path",
-    [
-        (2, "db1.sqlite"),
-        (2, "db2.sqlite"),
-        (1, "db1.sqlite"),
-    ],
-)
-def test_get_file(revision_nr, path, repository_inspected):
-    _, file = repository_inspected.get_file(revision_nr, Path(path))
-    assert file.path.name == path
-
-
-@pytest.mark.parametrize(
-    "revision_nr,path",
-    [
-        (0, "db2.sqlite"),
-        (1, "db3.sqlite"),
-    ],
-)
-def test_get_file_not_found(revision_nr, path, repository_inspected):
-    assert repository_inspected.get_file(revision_nr, Path(path))[1] is None
+def test_get_file(repository_inspected):
+    for revision_nr, path, expected_nr in [
+        (2, "db1.sqlite", 0),
+        (2, "db2.sqlite", 1),
+        (1, "db1.sqlite", 0),
+        (0, "db1.sqlite", 0),
+    ]:
+        found_nr, file = repository_inspected.get_file(revision_nr, Path(path))
+        assert (found_nr, file.path.name) == (expected_nr, path), (revision_nr, path)
+
+
+def test_get_file_not_found(repository_inspected):
+    for revision_nr, path in [(0, "db2.sqlite"), (1, "db3.sqlite")]:
+        _, file = repository_inspected.get_file(revision_nr, Path(path))
+        assert file is None, (revision_nr, path)
+
+
+def test_file_index_case_insensitive():
+    revisions = [
+        RepoRevisionFactory.build(
+            revision_nr=1, changes=[FileFactory.build(path=Path("rasters/DEM.tif"))]
+        ),
+        RepoRevisionFactory.build(
+            revision_nr=0,
+            changes=[
+                FileFactory.build(path=Path("rasters/dem.tif")),
+                FileFactory.build(path=Path("db1.sqlite")),
+            ],
+        ),
+    ]
+    file_index = FileIndex(revisions)
+    for revision_nr, path, expected in [
+        (1, "rasters/dem.tif", revisions[0].changes[0]),
+        (0, "RASTERS/DEM.TIF", revisions[1].changes[0]),
+        (1, "db1.sqlite", revisions[1].changes[1]),
+        (1, "DB1.sqlite", None),
+    ]:
+        _, file = file_index.get_file(revision_nr, Path(path))
+        assert file is expected, (revision_nr, path)
@@ -1,14 +1,50 @@
+from threedi_model_migration.file import RasterOptions
+from threedi_model_migration.sql import connect
 from threedi_model_migration.sql import filter_global_settings
 from threedi_model_migration.sql import select
+from threedi_model_migration.sql import select_rasters
 from threedi_model_migration.sql import SETTINGS_SQL
 
-import shutil
+import pytest
+import sqlite3
 
 
-def test_filter_global_settings(repository, tmp_path):
-    repository.checkout(1)
+def test_filter_global_settings(db2_sqlite):
+    assert len(select(db2_sqlite, SETTINGS_SQL)) == 2
+    filter_global_settings(db2_sqlite, 1)
+    assert select(db2_sqlite, SETTINGS_SQL) == [(1, "default")]
 
-    shutil.copyfile(repository.path / "db2.sqlite", tmp_path / "db2.sqlite")
-    assert len(select(tmp_path / "db2.sqlite", SETTINGS_SQL)) == 2
-    filter_global_settings(tmp_path / "db2.sqlite", 1)
-    assert select(tmp_path / "db2.sqlite", SETTINGS_SQL) == [(1, "default")]
+
+def test_select_not_a_database(tmp_path):
+    path = tmp_path / "stub.sqlite"
+    path.write_bytes(b"e3b0c44298fc1c149afbf4c8996fb92427ae41e4\n")
+    with pytest.raises(sqlite3.DatabaseError):
+        select(path, SETTINGS_SQL)
+    assert [x.name for x in tmp_path.iterdir()] == ["stub.sqlite"]
+
+
+def test_select_missing_file(tmp_path):
+    path = tmp_path / "broken.sqlite"
+    path.symlink_to(tmp_path / "nonexisting.sqlite")
+    with pytest.raises(sqlite3.DatabaseError):
+        select(path, SETTINGS_SQL)
+
+
+def test_select_rasters(db2_sqlite_original):
+    with connect(db2_sqlite_original) as con:
+        rasters = select_rasters(con, 2)
+    assert len(rasters) == len(RasterOptions)
+    assert rasters[RasterOptions.dem_file] == ["rasters/dem.tif", "rasters/dem.tif"]
+    assert rasters[RasterOptions.groundwater_impervious_layer_level_file] == [
+        None,
+        "rasters/x.tif",
+    ]
+
+
+def test_select_rasters_missing_table(db1_sqlite_original):
+    # db1.sqlite has no groundwater table
+    with connect(db1_sqlite_original) as con:
+        rasters = select_rasters(con, 1)
+    assert len(rasters) == len(RasterOptions)
+    assert rasters[RasterOptions.dem_file] == ["rasters/dem.tif"]
+    assert rasters[RasterOptions.leakage_file] == [None]
@@ -3,13 +3,15 @@ from threedi_model_migration.zip_utils import deterministic_zip
 
 import io
 import os
+import pytest
 import time
 
 
-def test_determistic_zip(tmp_path):
+@pytest.mark.parametrize("size", [3, 1 << 20, 16 << 20])
+def test_determistic_zip(tmp_path, size):
     path = tmp_path / "file.txt"
-    with path.open("w") as f:
-        f.write("foo")
+    with path.open("wb") as f:
+        f.write(b"x" * size)
 
     s1 = io.BytesIO()
     deterministic_zip(s1, [path])
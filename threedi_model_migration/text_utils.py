@@ -2,6 +2,10 @@ import re
 import unicodedata
 
 
+SLUGIFY_STRIP_REGEX = re.compile(r"[^\w\s-]")
+SLUGIFY_HYPHENATE_REGEX = re.compile(r"[-\s]+")
+
+
 def slugify(value, allow_unicode=False):
     """
     Copy from Django's slugify
@@ -19,8 +23,8 @@ def slugify(value, allow_unicode=False):
             .encode("ascii", "ignore")
             .decode("ascii")
         )
-    value = re.sub(r"[^\w\s-]", "", value).strip().lower()
-    return re.sub(r"[-\s]+", "-", value)
+    value = SLUGIFY_STRIP_REGEX.sub("", value).strip().lower()
+    return SLUGIFY_HYPHENATE_REGEX.sub("-", value)
 
 
 def make_utf8(value):
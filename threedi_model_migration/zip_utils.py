@@ -1,26 +1,37 @@
 """Edited from: https://github.com/bboe/deterministic_zip/blob/main/deterministic_zip/__init__.py"""
 
+from .compat import ZIPINFO_COMPRESS_LEVEL
 from typing import BinaryIO
 from typing import List
 
+import os
+import shutil
 import stat
 import zipfile
 
 
 def _add_file(zip_file, path, zip_path=None):
-    zip_info = zipfile.ZipInfo.from_file(path, zip_path)
-    zip_info.date_time = (2000, 1, 1, 0, 0, 0)
+    # Normalize the archive name like ZipInfo.from_file does; the file stat it
+    # takes is not needed, as date_time and external_attr are fixed anyway
+    zip_path = os.path.normpath(os.path.splitdrive(zip_path or path)[1])
+    while zip_path[0] in (os.sep, os.altsep):
+        zip_path = zip_path[1:]
+    zip_info = zipfile.ZipInfo(zip_path, date_time=(2000, 1, 1, 0, 0, 0))
     zip_info.external_attr = (stat.S_IFREG | 0o664) << 16
+    # ZipFile.open ignores the archive's compression settings when given a
+    # ZipInfo, so copy them over
+    zip_info.compress_type = zip_file.compression
+    setattr(zip_info, ZIPINFO_COMPRESS_LEVEL, zip_file.compresslevel)
     with open(path, "rb") as fp:
-        zip_file.writestr(
-            zip_info,
-            fp.read(),
-            compress_type=zipfile.ZIP_DEFLATED,
-            compresslevel=9,
-        )
+        # The (uncompressed) size decides whether ZIP64 extensions are needed
+        zip_info.file_size = os.fstat(fp.fileno()).st_size
+        with zip_file.open(zip_info, "w") as dest:
+            shutil.copyfileobj(fp, dest)
 
 
-def deterministic_zip(fp: BinaryIO, paths: List[str]):
-    with zipfile.ZipFile(fp, "w") as zip_file:
+def deterministic_zip(fp: BinaryIO, paths: List[str], compresslevel: int = 6):
+    with zipfile.ZipFile(
+        fp, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel
+    ) as zip_file:
         for path in paths:
             _add_file(zip_file, path, path)